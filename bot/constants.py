@@ -10,13 +10,8 @@ USER_GUIDE: str = urljoin(HOMEPAGE, "userguide.html")
 
 ENCLOSING_CHAR = "+"
 """:obj:`str`: Character that marks the beginning & end of a search query in an inline search."""
-ENCLOSED_REGEX = re.compile(
-    rf"[^{ENCLOSING_CHAR}]*\{ENCLOSING_CHAR}([a-zA-Z_/.0-9]*)\{ENCLOSING_CHAR}"
-)
+ENCLOSED_REGEX = re.compile(rf"\{ENCLOSING_CHAR}([a-zA-Z_/.0-9]*)\{ENCLOSING_CHAR}")
 """:obj:`re.Pattern`: Pattern that matches any search query enclosed in :attr:`ENCLOSING_CHAR`."""
-
-SSE_KEY = "search_key"
-""":obj:`str`: The key of ``bot_data`` where the :class:`bot.search.SphinxSearchEngine` is stored.
-"""
-ADMIN_KEY = "admin_key"
-""":obj:`str`: The key of ``bot_data`` where the admins chat id is stored."""
+INSERT_SEARCH_REGEX = re.compile(rf".*?{ENCLOSED_REGEX.pattern}", flags=re.DOTALL)
+""":obj:`re.Pattern`: Pattern for :func:`re.match` that matches any text containing a search query
+enclosed in :attr:`ENCLOSING_CHAR`."""
@@ -1,27 +1,35 @@
 #!/usr/bin/env python3
 """The module contains the error handler."""
-import html
 import json
 import logging
 import traceback
 from typing import cast
 
 from telegram import Update
+from telegram.constants import MessageLimit
 from telegram.error import BadRequest
 from telegram.ext import CallbackContext
 
-from bot.constants import ADMIN_KEY
-
 logger = logging.getLogger(__name__)
 
+_HTML_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+# Leaves some room for the text around the <pre> blocks
+_MAX_PRE_LENGTH = MessageLimit.MAX_TEXT_LENGTH - 100
+
+
+def _escape(text: str) -> str:
+    # Within <pre> and <code> blocks, we don't need to escape quotes like html.escape does
+    return text.translate(_HTML_ESCAPE_TABLE)
+
 
-async def error_handler(update: object, context: CallbackContext) -> None:
+async def error_handler(update: object, context: CallbackContext, *, admin_id: int) -> None:
     """
     Log the error and send a Telegram message to notify the admin.
 
     Args:
         update: The incoming update. Not necessarily a Telegram update.
         context: The context as provided by the :class:`telegram.ext.Dispatcher`.
+        admin_id: The admins Telegram chat ID. Meant to be bound via :func:`functools.partial`.
 
     """
     # Log the error before we do anything else, so we can see it even if something breaks.
@@ -33,26 +41,34 @@ async def error_handler(update: object, context: CallbackContext) -> None:
         None, context.error, cast(Exception, context.error).__traceback__
     )
     tb_string = "".join(tb_list)
+    if len(tb_string) > _MAX_PRE_LENGTH:
+        # The end of the traceback is where the exception is
+        tb_string = f"…{tb_string[-_MAX_PRE_LENGTH:]}"
 
     # Build the message with some markup and additional information about what happened.
-    # You might need to add some logic to deal with messages longer than the 4096 character limit.
+    # Messages longer than the 4096 character limit are truncated up front, so that we don't
+    # waste a request that is bound to fail.
     update_str = update.to_dict() if isinstance(update, Update) else str(update)
+    update_json = json.dumps(update_str, indent=2, ensure_ascii=False)
+    if len(update_json) > _MAX_PRE_LENGTH:
+        update_json = json.dumps(update_str, separators=(",", ":"), ensure_ascii=False)
+        if len(update_json) > _MAX_PRE_LENGTH:
+            update_json = f"{update_json[:_MAX_PRE_LENGTH]}…"
     message_1 = (
         f"An exception was raised while handling an update\n\n"
-        f"<pre>update = {html.escape(json.dumps(update_str, indent=2, ensure_ascii=False))}</pre>"
+        f"<pre>update = {_escape(update_json)}</pre>"
     )
-    message_2 = f"<pre>{html.escape(tb_string)}</pre>"
+    message_2 = f"<pre>{_escape(tb_string)}</pre>"
 
     # Finally, send the messages
     # We send update and traceback in two parts to reduce the chance of hitting max length
-    admin_id = context.bot_data[ADMIN_KEY]
     try:
         sent_message = await context.bot.send_message(chat_id=admin_id, text=message_1)
         await sent_message.reply_html(message_2)
     except BadRequest as exc:
         if "too long" in str(exc):
             message = (
-                f"Hey.\nThe error <code>{html.escape(str(context.error))}</code> happened."
+                f"Hey.\nThe error <code>{_escape(str(context.error))}</code> happened."
                 f" The traceback is too long to send, but it was written to the log."
             )
             await context.bot.send_message(chat_id=admin_id, text=message)
@@ -1,66 +1,84 @@
 #!/usr/bin/env python3
 """The module contains functions for the inline mode."""
-import re
-from typing import Tuple, cast
+import asyncio
+from functools import partial
+from typing import Dict, Match, Tuple, cast
 
 from telegram import InlineQuery, InlineQueryResultArticle, InputTextMessageContent, Update
 from telegram.ext import ContextTypes
 
-from bot.constants import ENCLOSED_REGEX, ENCLOSING_CHAR, SSE_KEY
+from bot.constants import ENCLOSED_REGEX
 from bot.sphinx_search_engine import SphinxSearchEngine
 
 
-async def direct_search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+def _insert_link(match: Match[str], links: Dict[str, str]) -> str:
+    return links.get(SphinxSearchEngine.normalize_query(match.group(1)), match.group(0))
+
+
+async def direct_search(
+    update: Update, _: ContextTypes.DEFAULT_TYPE, *, sse: SphinxSearchEngine
+) -> None:
     """
     Puts the inline query directly through :meth:`SphinxSearchEngine.inline_results` and displays
     the corresponding results.
 
     Args:
         update: The incoming Telegram update containing a message.
-        context: The context as provided by the :class:`telegram.ext.Dispatcher`.
+        sse: The search engine. Meant to be bound via :func:`functools.partial`.
 
     """
     inline_query = cast(InlineQuery, update.inline_query)
-    if not inline_query.query:
+    query = sse.normalize_query(inline_query.query)
+    if not query:
         return
-    sse = cast(SphinxSearchEngine, context.bot_data[SSE_KEY])
-    await inline_query.answer(
-        results=lambda page: sse.inline_search_results(inline_query.query, page=page),
-        auto_pagination=True,
+    # Searching is CPU bound, so we don't want to block the event loop with it
+    page = int(inline_query.offset) if inline_query.offset else 0
+    results = await asyncio.get_running_loop().run_in_executor(
+        None, partial(sse.inline_search_results, query, page=page)
     )
+    await inline_query.answer(results=results, next_offset=str(page + 1) if results else "")
 
 
-async def insert_search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def insert_search(
+    update: Update, _: ContextTypes.DEFAULT_TYPE, *, sse: SphinxSearchEngine
+) -> None:
     """
     Searches for results for all terms enclosed in ``+`` and displays corresponding results.
 
     Args:
         update: The incoming Telegram update containing a message.
-        context: The context as provided by the :class:`telegram.ext.Dispatcher`.
+        sse: The search engine. Meant to be bound via :func:`functools.partial`.
 
     """
     inline_query = cast(InlineQuery, update.inline_query)
     if not inline_query.query:
         return
-    sse = cast(SphinxSearchEngine, context.bot_data[SSE_KEY])
 
-    queries = cast(Tuple[str], tuple(re.findall(ENCLOSED_REGEX, inline_query.query)))
-    combinations = sse.multi_search_combinations(queries)
+    queries = cast(
+        Tuple[str],
+        tuple(sse.normalize_query(query) for query in ENCLOSED_REGEX.findall(inline_query.query)),
+    )
+    combinations = await asyncio.get_running_loop().run_in_executor(
+        None, partial(sse.multi_search_combinations, queries)
+    )
 
+    # The combinations don't keep the order of the queries, but the description should
+    unique_queries = tuple(dict.fromkeys(queries))
+    title = f"Insert links to the documentation of {sse.project_description}"
     inline_results = []
     for i, combination in enumerate(combinations):
-        text = inline_query.query
-        for query, entry in combination.items():
-            text = text.replace(
-                f"{ENCLOSING_CHAR}{query}{ENCLOSING_CHAR}",
-                f'<a href="{entry.url}">{entry.name}</a>',
-            )
+        links = {
+            query: f'<a href="{entry.url}">{entry.name}</a>'
+            for query, entry in combination.items()
+        }
+        # Insert all links in a single pass over the query
+        text = ENCLOSED_REGEX.sub(partial(_insert_link, links=links), inline_query.query)
         inline_results.append(
             InlineQueryResultArticle(
                 id=str(i),
-                title=f"Insert links to the documentation of {sse.project_description}",
+                title=title,
                 input_message_content=InputTextMessageContent(text),
-                description=", ".join(entry.name for entry in combination.values()),
+                description=", ".join(combination[query].name for query in unique_queries),
             )
         )
 
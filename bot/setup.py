@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 """The module contains functions that register the handlers."""
+from functools import partial
+
 from telegram.ext import Application, CommandHandler, InlineQueryHandler
 
-from bot.constants import ADMIN_KEY, ENCLOSED_REGEX, SSE_KEY
+from bot.constants import INSERT_SEARCH_REGEX
 from bot.error_handler import error_handler
 from bot.inline import direct_search, insert_search
-from bot.simple_commands import info
+from bot.simple_commands import build_info, info
 from bot.sphinx_search_engine import SphinxSearchEngine
 
 
@@ -13,7 +15,7 @@ async def setup_application(
     application: Application, cache_timeout: int, admin: int, docs_url: str
 ) -> None:
     """
-    Registers the different handlers, prepares ``chat/user/bot_data`` etc.
+    Registers the different handlers and binds the search engine and the admins chat ID to them.
 
     Args:
         application: The application.
@@ -22,15 +24,20 @@ async def setup_application(
         docs_url: The URL of the Sphinx docs.
 
     """
-    application.bot_data[ADMIN_KEY] = admin
     sse = SphinxSearchEngine(url=docs_url, cache_timeout=cache_timeout)
-    application.bot_data[SSE_KEY] = sse
     await sse.initialize(application=application)
 
-    application.add_handler(CommandHandler(["start", "help", "info"], info))
-    application.add_handler(InlineQueryHandler(insert_search, pattern=ENCLOSED_REGEX))
+    info_text, info_markup = build_info(application.bot.bot.full_name, sse)
+    application.add_handler(
+        CommandHandler(
+            ["start", "help", "info"], partial(info, text=info_text, reply_markup=info_markup)
+        )
+    )
+    application.add_handler(
+        InlineQueryHandler(partial(insert_search, sse=sse), pattern=INSERT_SEARCH_REGEX)
+    )
 
-    application.add_handler(InlineQueryHandler(direct_search))
+    application.add_handler(InlineQueryHandler(partial(direct_search, sse=sse)))
 
     await application.bot.set_my_commands(
         [
@@ -38,4 +45,4 @@ async def setup_application(
         ]
     )
 
-    application.add_error_handler(error_handler)
+    application.add_error_handler(partial(error_handler, admin_id=admin))
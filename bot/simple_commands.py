@@ -1,25 +1,28 @@
 #!/usr/bin/env python3
 """The module contains some basic functionality."""
-from typing import cast
+from typing import Tuple, cast
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, Update
 from telegram.ext import ContextTypes
 
-from bot.constants import SSE_KEY, USER_GUIDE
+from bot.constants import USER_GUIDE
 from bot.sphinx_search_engine import SphinxSearchEngine
 
 
-async def info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+def build_info(bot_name: str, sse: SphinxSearchEngine) -> Tuple[str, InlineKeyboardMarkup]:
     """
-    Returns some info about the bot.
+    Builds the message that :func:`info` replies with. It only depends on data that is static
+    after startup, so this needs to be done only once.
 
     Args:
-        update: The Telegram update.
-        context: The callback context as provided by the application.
+        bot_name: The full name of the bot.
+        sse: The search engine.
+
+    Returns:
+        The text and the reply markup of the message.
     """
-    sse = cast(SphinxSearchEngine, context.bot_data[SSE_KEY])
     text = (
-        f"Hi! I am <b>{context.bot.bot.full_name}</b> and here to help you search "
+        f"Hi! I am <b>{bot_name}</b> and here to help you search "
         f"the Documentation of <i>{sse.project_description}</i>."
         "\n\nFor details on how to use me, please visit the user guide below. 🙂."
     )
@@ -31,4 +34,24 @@ async def info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         ]
     )
 
-    await cast(Message, update.effective_message).reply_text(text, reply_markup=keyboard)
+    return text, keyboard
+
+
+async def info(
+    update: Update,
+    _: ContextTypes.DEFAULT_TYPE,
+    *,
+    text: str,
+    reply_markup: InlineKeyboardMarkup,
+) -> None:
+    """
+    Returns some info about the bot.
+
+    Args:
+        update: The Telegram update.
+        text: The text as built by :func:`build_info`. Meant to be bound via
+            :func:`functools.partial`.
+        reply_markup: The reply markup as built by :func:`build_info`. Meant to be bound via
+            :func:`functools.partial`.
+    """
+    await cast(Message, update.effective_message).reply_text(text, reply_markup=reply_markup)
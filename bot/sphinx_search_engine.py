@@ -1,22 +1,42 @@
 #!/usr/bin/env python3
 """The module contains the classes :class:`SphinxSearchEngine` and :class:`SphinxDocEntry`."""
+import asyncio
 import datetime as dtm
 import heapq
 import itertools
 import re
-from functools import lru_cache
-from io import BytesIO
-from typing import Dict, List, Optional, Tuple, cast
+import sys
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, cast
 from urllib.parse import urljoin
 
-from httpx import AsyncClient, Request
-from rapidfuzz import fuzz
-from sphinx.util.inventory import InventoryFile
+import numpy as np
+from cachetools import LRUCache
+from httpx import AsyncClient, codes
+from rapidfuzz import fuzz, process
 from telegram import InlineQueryResultArticle, InputTextMessageContent, constants
 from telegram.ext import Application, ContextTypes, JobQueue
 
 PreProcessedQuery = List[str]
 
+_INVENTORY_HEADER = "# Sphinx inventory version 2"
+"""The first line of the supported ``objects.inv`` files."""
+_INVENTORY_LINE = re.compile(r"(.+?)\s+(\S+)\s+(-?\d+)\s+?(\S*)\s+(.*)")
+"""Pattern for the lines of an ``objects.inv`` file. Names may contain whitespace, so we can't
+just split the lines. Taken from :mod:`sphinx.util.inventory`."""
+_INVENTORY_CHUNK_SIZE = 64 * 1024
+"""Number of compressed bytes of an ``objects.inv`` file that are decompressed at once."""
+_SPLIT_TABLE = str.maketrans("/-", "..")
+"""Translation table that maps all characters that :meth:`SphinxSearchEngine.parse_query` splits
+on to ``.``."""
+_PART_SCORE_CUTOFF = 50
+"""Comparison scores of single parts of a query below this value are treated as ``0``."""
+_CACHE_SIZE = 256
+"""Number of queries for which each cache of :class:`SphinxSearchEngine` holds the results."""
+_MAX_INLINE_RESULTS = 300
+"""Number of results of :meth:`SphinxSearchEngine.search` that are offered in inline mode."""
+
 
 class SphinxDocEntry:  # pylint: disable=R0903
     """This class represents an entry in a Sphinx documentation.
@@ -39,6 +59,15 @@ class SphinxDocEntry:  # pylint: disable=R0903
 
     """
 
+    __slots__ = (
+        "project_name",
+        "version",
+        "url",
+        "entry_type",
+        "name",
+        "display_name",
+    )
+
     def __init__(  # pylint: disable=R0913
         self,
         project_name: str,
@@ -48,43 +77,128 @@ class SphinxDocEntry:  # pylint: disable=R0903
         name: str,
         display_name: str = None,
     ) -> None:
-        self.project_name = project_name
-        self.version = version
+        # There are only a few distinct values of these across thousands of entries
+        self.project_name = sys.intern(project_name)
+        self.version = sys.intern(version)
         self.url = url
-        self.entry_type = entry_type
+        self.entry_type = sys.intern(entry_type)
         self.name = name
         self.display_name = display_name
-        self._parsed_name: Optional[PreProcessedQuery] = None
 
-    def compare_to(self, query: str, processed_query: PreProcessedQuery) -> float:
-        """
-        Compares this entry to a query.
 
-        Args:
-            query: The query as plain string.
-            processed_query: The Query, preprocessed by :meth:`SphinxSearchEngine.parse_query`
+SearchCombination = Dict[str, SphinxDocEntry]
 
-        Returns:
-            The comparison score.
-        """
-        if self._parsed_name is None:
-            self._parsed_name = SphinxSearchEngine.parse_query(self.name)
-        score = 0.0
 
-        # We compare all the single parts of the query …
-        for target, value in zip(processed_query, self._parsed_name):
-            score += fuzz.ratio(target, value)
-        # … and the full name because we're generous
-        score += fuzz.ratio(query, self.name)
+class _SearchIndex:  # pylint: disable=R0903
+    """Precomputed data needed to score queries against a fixed set of entries. Everything is
+    parallel to :attr:`entries`, such that the whole corpus can be scored in batched calls.
+
+    Instances are never modified after creation. :class:`SphinxSearchEngine` replaces its index as
+    a whole when the docs change, so that searches never see a half-updated index.
+
+    Args:
+        doc_data: The entries by name.
+
+    Attributes:
+        entries (:class:`numpy.ndarray`): The entries as object array, such that results can be
+            picked by fancy indexing.
+        names (List[:obj:`str`]): The lowercased names of the entries.
+        name_columns (List[List[:obj:`str`]]): The j-th column holds the j-th part of each parsed
+            name or ``""`` if there is none.
+        column_masks (List[:class:`numpy.ndarray`]): Tells for each column which entries actually
+            have a j-th part.
+        multipliers (:class:`numpy.ndarray`): The factors that the comparison scores of the
+            entries are multiplied with.
+        messages (:class:`numpy.ndarray`): The texts of the messages that are sent when an entry
+            is selected in inline mode.
+        descriptions (:class:`numpy.ndarray`): The descriptions of the entries in inline mode.
+    """
+
+    __slots__ = (
+        "entries",
+        "names",
+        "name_columns",
+        "column_masks",
+        "multipliers",
+        "messages",
+        "descriptions",
+    )
+
+    def __init__(self, doc_data: Dict[str, SphinxDocEntry]) -> None:
+        self.entries = np.empty(len(doc_data), dtype=object)
+        self.entries[:] = list(doc_data.values())
+        # Searching is case-insensitive, see `normalize_query`
+        self.names = [entry.name.lower() for entry in self.entries]
+        # The parsed names are only needed to build the columns, so they are not kept
+        parsed_names = [SphinxSearchEngine.parse_query(name) for name in self.names]
+        self.name_columns = [
+            list(column) for column in itertools.zip_longest(*parsed_names, fillvalue="")
+        ]
+        lengths = np.fromiter(
+            (len(parts) for parts in parsed_names), dtype=np.intp, count=len(self.entries)
+        )
+        self.column_masks = [lengths > j for j in range(len(self.name_columns))]
 
         # IISC std: is the domain for general stuff like headlines and chapters.
         # we'll wanna give those a little less weight
-        if self.entry_type.startswith("std:"):
-            score *= 0.8
-        return score
+        is_std = np.fromiter(
+            (entry.entry_type.startswith("std:") for entry in self.entries),
+            dtype=bool,
+            count=len(self.entries),
+        )
+        self.multipliers = np.where(is_std, np.float32(0.8), np.float32(1))
+
+        # The inline results only differ in these texts, so they are built only once per entry
+        self.messages = np.empty(len(self.entries), dtype=object)
+        self.messages[:] = [
+            f'Documentation of <i>{entry.project_name}</i>: <a href="{entry.url}">'
+            f"{entry.display_name or entry.name}</a>"
+            for entry in self.entries
+        ]
+        self.descriptions = np.empty(len(self.entries), dtype=object)
+        self.descriptions[:] = [
+            f"Documentation of {entry.project_name}"
+            f'{", " + entry.display_name if entry.display_name else ""}'
+            for entry in self.entries
+        ]
+
+    def score(self, query: str) -> np.ndarray:
+        """Compares the query to all entries.
 
+        Args:
+            query: The normalized search query.
 
-class SphinxSearchEngine:
+        Returns:
+            The comparison scores, parallel to :attr:`entries`.
+        """
+        processed_query = SphinxSearchEngine.parse_query(query)
+
+        # We compare the full name because we're generous …
+        scores = process.cdist(
+            [query], self.names, scorer=fuzz.ratio, dtype=np.float32, workers=-1
+        )[0]
+        # … and all the single parts of the query. Entries with fewer parts than the query
+        # don't get any score for the surplus parts of the query. Low scores of the single parts
+        # are mostly noise, so we let rapidfuzz skip them early.
+        for target, column, mask in zip(processed_query, self.name_columns, self.column_masks):
+            part_scores = process.cdist(
+                [target],
+                column,
+                scorer=fuzz.ratio,
+                score_cutoff=_PART_SCORE_CUTOFF,
+                dtype=np.float32,
+                workers=-1,
+            )[0]
+            # A non-empty part scores 0 against the padding anyway, so only empty parts need
+            # the mask
+            if not target:
+                part_scores *= mask
+            scores += part_scores
+
+        return scores * self.multipliers
+
+
+class SphinxSearchEngine:  # pylint: disable=R0902
     """Class to handle fetching and searching Sphinx documentation.
 
     Args:
@@ -95,16 +209,37 @@ class SphinxSearchEngine:
     Attributes:
         url (:obj:`str`): URL of the Sphinx documentation.
         cache_timeout (:obj:`datetime.timedelta`): Cache timeout as :obj:`datetime.timedelta`.
+        project_description (:obj:`str`): The description of this project as reported by the
+            fetched documentation.
     """
 
     def __init__(self, url: str, cache_timeout: int) -> None:
         self.url = url
         self.cache_timeout = dtm.timedelta(minutes=cache_timeout)
+        self.project_description = ""
         self._http_client = AsyncClient(
-            headers={"User-Agent": "GitHub: Bibo-Joshi/sphinx-doc-bot"}
+            headers={"User-Agent": "GitHub: Bibo-Joshi/sphinx-doc-bot"}, http2=True
         )
-        self._request = Request(method="GET", url=urljoin(self.url, "objects.inv"))
+        self._inventory_url = urljoin(self.url, "objects.inv")
+        # Validators of the last fetched inventory for conditional requests
+        self._last_modified: Optional[str] = None
+        self._etag: Optional[str] = None
         self._doc_data: Dict[str, SphinxDocEntry] = {}
+        self._index = _SearchIndex(self._doc_data)
+        # The caches are shared between the threads that searches run in. Results are only cached
+        # if they were computed on the current index
+        self._cache_lock = threading.Lock()
+        # Maps normalized queries to the indices of (the most similar) entries of the index in the
+        # order of similarity and their scores
+        self._search_cache: "LRUCache[str, Tuple[np.ndarray, np.ndarray]]" = LRUCache(
+            maxsize=_CACHE_SIZE
+        )
+        self._inline_results_cache: "LRUCache[str, List[InlineQueryResultArticle]]" = LRUCache(
+            maxsize=_CACHE_SIZE
+        )
+        self._combinations_cache: (
+            "LRUCache[Tuple[Tuple[str, ...], int], List[SearchCombination]]"
+        ) = LRUCache(maxsize=_CACHE_SIZE)
 
     async def initialize(self, application: Application) -> None:
         """Initializes the search engine by fetching the docs for the first time and scheduling
@@ -117,10 +252,19 @@ class SphinxSearchEngine:
     async def _job(self, _: ContextTypes.DEFAULT_TYPE) -> None:
         await self.fetch_docs()
 
-    @property
-    def project_description(self) -> str:
-        """The description of this project as reported by the fetched documentation"""
-        return next(entry for entry in self._doc_data.values()).project_name
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        Normalizes the query such that queries differing only in case or surrounding whitespace
+        are treated the same.
+
+        Args:
+            query: The search query.
+
+        Returns:
+            The stripped and lowercased query.
+        """
+        return query.strip().lower()
 
     @staticmethod
     def parse_query(query: str) -> PreProcessedQuery:
@@ -135,115 +279,381 @@ class SphinxSearchEngine:
         """
         # reversed, so that 'class' matches the 'class' part of 'module.class' exactly instead of
         # not matching the 'module' part
-        return list(reversed(re.split(r"\.|/|-", query.strip())))
+        return query.strip().translate(_SPLIT_TABLE).split(".")[::-1]
 
-    async def fetch_docs(self) -> None:
+    async def fetch_docs(self, cached: bool = True) -> None:
         """
         Fetches the documentation.
 
         Args:
-            cached: Whether to respect caching or not. Defaults to :obj:`True`.
+            cached: Whether to respect caching or not. If :obj:`True`, the documentation is only
+                downloaded and processed again if it has changed since the last fetch. Defaults to
+                :obj:`True`.
+        """
+        headers = {}
+        if cached and self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        if cached and self._etag:
+            headers["If-None-Match"] = self._etag
+        response = await self._http_client.get(self._inventory_url, headers=headers)
+        if response.status_code == codes.NOT_MODIFIED:
+            return
+        response.raise_for_status()
+
+        # Parsing and indexing the docs is CPU bound, so we do it in worker threads such that the
+        # bot can keep answering queries in the meantime
+        loop = asyncio.get_running_loop()
+        doc_data = await loop.run_in_executor(None, self._parse_inventory, response.content)
+        # The validators may only be stored once the corresponding docs are in use. Otherwise,
+        # if indexing fails, all later conditional requests would skip the new docs.
+        last_modified = response.headers.get("Last-Modified")
+        etag = response.headers.get("ETag")
+
+        if (
+            cached
+            and doc_data.keys() == self._doc_data.keys()
+            and all(entry is self._doc_data[name] for name, entry in doc_data.items())
+        ):
+            with self._cache_lock:
+                self._last_modified = last_modified
+                self._etag = etag
+            return
+
+        # Build the new index completely before swapping it in, such that concurrent searches
+        # either use the old or the new index
+        index = await loop.run_in_executor(None, _SearchIndex, doc_data)
+        with self._cache_lock:
+            self._doc_data = doc_data
+            self._index = index
+            self._last_modified = last_modified
+            self._etag = etag
+            # This is important: If the docs have changed the cache is useless …
+            recent_queries = list(self._search_cache)
+            self._search_cache.clear()
+            self._inline_results_cache.clear()
+            self._combinations_cache.clear()
+        if index.entries.size:
+            self.project_description = index.entries[0].project_name
+        # … but the queries that were searched recently will probably be searched again
+        await loop.run_in_executor(None, self.warmup, recent_queries)
+
+    @staticmethod
+    def _read_inventory(
+        content: bytes, url: str
+    ) -> Tuple[str, str, Dict[str, Dict[str, Tuple[str, str]]]]:
+        """Reads an ``objects.inv`` file of version 2.
+
+        Args:
+            content: The content of the ``objects.inv`` file.
+            url: The URL of the documentation that the locations are relative to.
+
+        Returns:
+            The project name, the version and for each entry type a dict mapping the names of the
+            entries to their URL and display name.
+        """
+        # Four lines of header, then the zlib compressed entries
+        parts = content.split(b"\n", 4)
+        if len(parts) < 5 or parts[0].decode().rstrip() != _INVENTORY_HEADER:
+            raise ValueError(f"Unsupported inventory header: {parts[0]!r}")
+        if b"zlib" not in parts[3]:
+            raise ValueError(f"Unsupported inventory compression: {parts[3]!r}")
+        # Strip "# Project: " and "# Version: "
+        project_name = parts[1].decode().rstrip()[11:]
+        version = parts[2].decode().rstrip()[11:]
+
+        # Group by entry type like Sphinx does, such that the precedence of entries with the
+        # same name is the same as before
+        data: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        for line in SphinxSearchEngine._decompress_lines(parts[4]):
+            match = _INVENTORY_LINE.match(line.rstrip())
+            if not match:
+                continue
+            name, entry_type, _, location, raw_display_name = match.groups()
+            if ":" not in entry_type:
+                continue
+            items = data.setdefault(entry_type, {})
+            # Old Sphinx versions created two entries for modules, the first one is correct
+            if entry_type == "py:module" and name in items:
+                continue
+            if location.endswith("$"):
+                location = location[:-1] + name
+            items[name] = (urljoin(url, location), raw_display_name)
+        return project_name, version, data
+
+    @staticmethod
+    def _decompress_lines(compressed: bytes) -> Iterator[str]:
+        """Decompresses the entries of an ``objects.inv`` file chunk by chunk, such that the
+        decompressed data never needs to be held in memory as a whole.
+
+        Args:
+            compressed: The zlib compressed entries.
+
+        Yields:
+            The decoded lines.
+        """
+        decompressor = zlib.decompressobj()
+        view = memoryview(compressed)
+        buffer = b""
+        for start in range(0, len(view), _INVENTORY_CHUNK_SIZE):
+            chunk = view[start : start + _INVENTORY_CHUNK_SIZE]  # noqa: E203
+            buffer += decompressor.decompress(chunk)
+            # The last line may be incomplete, so we keep it for the next chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line.decode()
+        buffer += decompressor.flush()
+        for line in buffer.split(b"\n"):
+            yield line.decode()
+
+    def _parse_inventory(self, content: bytes) -> Dict[str, SphinxDocEntry]:
+        """Parses the inventory. Entries that didn't change compared to the current docs are
+        reused, such that :meth:`fetch_docs` can tell whether anything changed.
+
+        Args:
+            content: The content of the ``objects.inv`` file.
+
+        Returns:
+            The entries by name.
         """
-        response = await self._http_client.send(self._request)
-        docs_data = response.content
-        data = InventoryFile.load(BytesIO(docs_data), self.url, urljoin)
+        project_name, version, data = self._read_inventory(content, self.url)
+        doc_data: Dict[str, SphinxDocEntry] = {}
         for entry_type, items in data.items():
-            for name, (project_name, version, url, display_name) in items.items():
-                self._doc_data[name] = SphinxDocEntry(
-                    name=name,
-                    project_name=project_name,
-                    version=version,
-                    url=url,
-                    display_name=display_name if display_name.strip() != "-" else None,
-                    entry_type=entry_type,
-                )
-        # This is important: If the docs have changed the cache is useless
-        self.search.cache_clear()
-        self.inline_search_results.cache_clear()
-        self.multi_search_combinations.cache_clear()
-
-    @lru_cache(maxsize=256)
+            for name, (url, raw_display_name) in items.items():
+                display_name = raw_display_name if raw_display_name.strip() != "-" else None
+                entry = self._doc_data.get(name)
+                if entry is None or (
+                    entry.project_name,
+                    entry.version,
+                    entry.url,
+                    entry.entry_type,
+                    entry.display_name,
+                ) != (project_name, version, url, entry_type, display_name):
+                    entry = SphinxDocEntry(
+                        name=name,
+                        project_name=project_name,
+                        version=version,
+                        url=url,
+                        display_name=display_name,
+                        entry_type=entry_type,
+                    )
+                doc_data[name] = entry
+        return doc_data
+
     def search(self, query: str, count: int = None) -> List[SphinxDocEntry]:
         """Compares the query to all entries in the documentation and returns them in the order
-        of similarity.
+        of similarity. The results are cached, such that later calls with the same or a smaller
+        ``count`` don't need to rank the entries again.
 
         Args:
-            query: The search query
+            query: The search query. Expected to be normalized by :meth:`normalize_query`.
             count: Optional. If passed, returns the ``count`` elements with highest comparison
                 score.
 
         Returns:
             The sorted results.
         """
-        processed_query = self.parse_query(query)
-        entries = list(self._doc_data.values())
+        index, order, _ = self._ranked_search(query, count)
+        return index.entries[order].tolist()
+
+    def _ranked_search(
+        self, query: str, count: Optional[int]
+    ) -> Tuple[_SearchIndex, np.ndarray, np.ndarray]:
+        """Like :meth:`search`, but returns the positions of the results in the index instead of
+        the results themselves.
+
+        Args:
+            query: The normalized search query.
+            count: Optional. The number of results to return.
+
+        Returns:
+            The index that was searched, the sorted positions of the results in that index and
+            their comparison scores.
+        """
+        # Use the same index throughout, even if the docs are updated in the meantime
+        with self._cache_lock:
+            index = self._index
+            cached = self._search_cache.get(query)
+        # The cached order may only cover the results of a previous, smaller ``count``
+        if cached is None or (
+            cached[0].size < index.entries.size and (not count or cached[0].size < count)
+        ):
+            scores = index.score(query)
+            order = self._rank(scores, count)
+            cached = (order, scores[order])
+            with self._cache_lock:
+                if index is self._index:
+                    self._search_cache[query] = cached
+
+        order, sorted_scores = cached
+        if count:
+            order, sorted_scores = order[:count], sorted_scores[:count]
+        return index, order, sorted_scores
 
-        def sort_key(entry: SphinxDocEntry) -> float:
-            return entry.compare_to(query, processed_query)
+    @staticmethod
+    def _rank(scores: np.ndarray, count: Optional[int]) -> np.ndarray:
+        """Sorts the indices of the scores by descending score, where ties are ordered by index.
+        If ``count`` is passed, only the ``count`` highest scores are sorted.
+
+        Args:
+            scores: The comparison scores.
+            count: Optional. The number of indices to return.
+
+        Returns:
+            The sorted indices.
+        """
+        # We want high values first
+        if not count or count >= scores.size:
+            return np.argsort(-scores, kind="stable")
 
-        if not count:
-            return sorted(
-                entries,
-                key=sort_key,
-                # We want high values first
-                reverse=True,
+        # Include all entries tied with the `count`-th highest score, such that the result is the
+        # same as slicing the full sort
+        threshold = np.partition(scores, -count)[-count]
+        candidates = np.flatnonzero(scores >= threshold)
+        return candidates[np.argsort(-scores[candidates], kind="stable")][:count]
+
+    def warmup(self, queries: Iterable[str]) -> None:
+        """Runs :meth:`search` for the queries such that the results shown in inline mode are
+        cached.
+
+        Args:
+            queries: The search queries.
+        """
+        for query in queries:
+            self.search(query, count=_MAX_INLINE_RESULTS)
+
+    def _build_inline_search_results(self, query: str) -> List[InlineQueryResultArticle]:
+        """Builds inline results from the first :data:`_MAX_INLINE_RESULTS` results of
+        :meth:`search`.
+
+        Args:
+            query: The search query.
+
+        Returns:
+            The inline results.
+
+        """
+        index, order, _ = self._ranked_search(query, _MAX_INLINE_RESULTS)
+        return [
+            InlineQueryResultArticle(
+                id=str(i),
+                title=entry.name,
+                input_message_content=InputTextMessageContent(message),
+                description=description,
+            )
+            for i, (entry, message, description) in enumerate(
+                zip(index.entries[order], index.messages[order], index.descriptions[order])
             )
-        return heapq.nlargest(count, entries, key=sort_key)
+        ]
 
-    @lru_cache(maxsize=256)
     def inline_search_results(self, query: str, page: int = 0) -> List[InlineQueryResultArticle]:
         """Builds inline results from the results of :meth:`search`.
 
         Args:
-            query: The search query.
+            query: The search query. Expected to be normalized by :meth:`normalize_query`.
             page: The pagination index.
 
         Returns:
             The inline results.
 
         """
+        with self._cache_lock:
+            index = self._index
+            results = self._inline_results_cache.get(query)
+        if results is None:
+            # Build all results at once, such that the pages can be sliced from them
+            results = self._build_inline_search_results(query)
+            with self._cache_lock:
+                if index is self._index:
+                    self._inline_results_cache[query] = results
+
         max_inline_query_results = constants.InlineQueryLimit.RESULTS
-        sorted_entries = self.search(query)[
+        return results[
             page * max_inline_query_results : (page + 1) * max_inline_query_results  # noqa: E203
         ]
-        return [
-            InlineQueryResultArticle(
-                id=str(i + page * max_inline_query_results),
-                title=entry.name,
-                input_message_content=InputTextMessageContent(
-                    f'Documentation of <i>{entry.project_name}</i>: <a href="{entry.url}">'
-                    f"{entry.display_name or entry.name}</a>"
-                ),
-                description=(
-                    f"Documentation of {entry.project_name}"
-                    f'{", " + entry.display_name if entry.display_name else ""}'
-                ),
-            )
-            for i, entry in enumerate(sorted_entries)
-        ]
 
-    @lru_cache(256)
     def multi_search_combinations(
         self, queries: Tuple[str], results_per_query: int = 3
-    ) -> List[Dict[str, SphinxDocEntry]]:
+    ) -> List[SearchCombination]:
         """For each query, runs :meth:`search` and fetches the ``results_per_query`` most likely
-        results. Then builds all possible combinations.
+        results. Then builds the possible combinations, ordered by the sum of the comparison
+        scores of their entries.
 
         Args:
-            queries: The search queries.
+            queries: The search queries. Expected to be normalized by :meth:`normalize_query`.
             results_per_query: Optional. Number of results to fetch per query. Defaults to ``3``.
 
         Returns:
-            All possible result combinations. Each list entry is a dictionary mapping each query
-                to the corresponding :class:`SphinxDocEntry`.
+            The result combinations, at most as many as can be shown as inline results. Each list
+                entry is a dictionary mapping each distinct query to the corresponding
+                :class:`SphinxDocEntry`, where the queries are in sorted order.
 
         """
-        # Don't use a page-argument here, as the number of results will usually be relatively small
+        # Don't use a page-argument here, as the number of results will be relatively small
         # so we can just build the list once and get slices from the cached result if necessary
-
-        results = {query: self.search(query=query, count=results_per_query) for query in queries}
-
+        if not queries:
+            return []
+
+        # A query that occurs multiple times gets the same link everywhere and the combinations
+        # don't depend on the order of the queries, so the same queries in a different order or
+        # number can share the cached combinations
+        unique_queries = tuple(sorted(set(queries)))
+        key = (unique_queries, results_per_query)
+        with self._cache_lock:
+            index = self._index
+            combinations = self._combinations_cache.get(key)
+        if combinations is None:
+            combinations = self._build_search_combinations(unique_queries, results_per_query)
+            with self._cache_lock:
+                if index is self._index:
+                    self._combinations_cache[key] = combinations
+        return combinations
+
+    def _build_search_combinations(
+        self, queries: Tuple[str, ...], results_per_query: int
+    ) -> List[SearchCombination]:
+        results = {query: self._ranked_search(query, count=results_per_query) for query in queries}
+        entries = [index.entries[order].tolist() for index, order, _ in results.values()]
+
+        # The number of combinations grows exponentially with the number of queries, but only
+        # so many can be shown anyway
         return [
-            dict(zip(queries, query_results))
-            for query_results in itertools.product(*results.values())
+            dict(zip(results, (query_entries[i] for query_entries, i in zip(entries, indices))))
+            for indices in itertools.islice(
+                self._best_first_indices([scores.tolist() for _, _, scores in results.values()]),
+                constants.InlineQueryLimit.RESULTS,
+            )
         ]
+
+    @staticmethod
+    def _best_first_indices(scores: List[List[float]]) -> Iterator[Tuple[int, ...]]:
+        """Picks one score from each list in all possible ways, ordered by descending sum of the
+        picked scores. Instead of building all combinations, they are visited best first:
+        Starting from the combination of all highest scores, the next best combination is always
+        reachable by picking the next lower score from one of the lists.
+
+        Args:
+            scores: The score lists, each sorted in descending order.
+
+        Yields:
+            For each combination, the indices of the picked scores.
+        """
+        if not all(scores):
+            return
+
+        def total_score(indices: Tuple[int, ...]) -> float:
+            return sum(list_scores[i] for list_scores, i in zip(scores, indices))
+
+        start = (0,) * len(scores)
+        heap = [(-total_score(start), start)]
+        seen = {start}
+        while heap:
+            _, indices = heapq.heappop(heap)
+            yield indices
+            for position, i in enumerate(indices):
+                if i + 1 < len(scores[position]):
+                    next_indices = list(indices)
+                    next_indices[position] += 1
+                    successor = tuple(next_indices)
+                    if successor not in seen:
+                        seen.add(successor)
+                        heapq.heappush(heap, (-total_score(successor), successor))